@@ -1,7 +1,26 @@
 import asyncio
+import collections
+import functools
 import logging
-import time
-from typing import Optional, Dict, Literal
+import math
+import platform
+import sys
+import warnings
+from multiprocessing import resource_tracker, shared_memory
+from time import monotonic as _monotonic
+from typing import Optional, Dict, List, Literal, Tuple
+
+import numpy as np
+
+try:
+    from numba import float64, int64, njit, types
+except ImportError:
+    njit = None  # the per-tick core then runs as plain Python
+
+try:
+    import uvloop  # libuv-backed event loop; optional, falls back to the default asyncio loop
+except ImportError:
+    uvloop = None
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -9,6 +28,12 @@ logger = logging.getLogger("StraddleScalper")
 
 class StraddleConfig:
     """Configuration for the Dynamic Straddle Scalper."""
+    __slots__ = (
+        'symbol', 'straddle_gap_pips', 'stop_loss_pips', 'take_profit_pips',
+        'trailing_start_pips', 'trailing_step_pips', 'velocity_threshold_pips',
+        'max_spread_pips', 'lot_size', 'ema_alpha', 'emit_coalesce_s',
+    )
+
     def __init__(
         self,
         symbol: str = "EURUSD",
@@ -19,7 +44,9 @@ class StraddleConfig:
         trailing_step_pips: float = 0.5,      # Step update size
         velocity_threshold_pips: float = 0.5, # "Frequency" filter: min movement per second to activate
         max_spread_pips: float = 1.0,         # Spread filter
-        lot_size: float = 0.01
+        lot_size: float = 0.01,
+        ema_alpha: float = 0.3,               # Velocity smoothing weight given to the newest tick
+        emit_coalesce_s: float = 0.05         # Min seconds between MODIFY_SL emissions; newer SLs overwrite pending ones
     ):
         self.symbol = symbol
         self.straddle_gap_pips = straddle_gap_pips
@@ -30,15 +57,459 @@ class StraddleConfig:
         self.velocity_threshold_pips = velocity_threshold_pips
         self.max_spread_pips = max_spread_pips
         self.lot_size = lot_size
+        self.ema_alpha = ema_alpha
+        self.emit_coalesce_s = emit_coalesce_s
 
 class MarketData:
-    """Simple structure to hold tick data."""
-    def __init__(self, bid: float, ask: float, timestamp: float):
+    """Simple structure to hold tick data.
+
+    Timestamps are monotonic seconds. Feed handlers should pass the parser-side
+    timestamp; it is only read from the local clock when omitted.
+    """
+    # Allocated per tick: no per-instance __dict__
+    __slots__ = ('bid', 'ask', 'timestamp', 'mid')
+
+    def __init__(self, bid: float, ask: float, timestamp: Optional[float] = None):
         self.bid = bid
         self.ask = ask
-        self.timestamp = timestamp
+        self.timestamp = _monotonic() if timestamp is None else timestamp
         self.mid = (bid + ask) / 2
 
+# Pip arithmetic as multiplications only (assuming 4 digit broker for simplicity)
+PIP_SIZE = 1e-4          # price units per pip
+PIPS_PER_UNIT = 10000.0  # pips per price unit
+
+# Action codes returned by the per-tick core; turned into instruction dicts at the API boundary
+ACT_NONE = 0
+ACT_OPEN_BUY = 1
+ACT_OPEN_SELL = 2
+ACT_CLOSE_BUY = 3
+ACT_CLOSE_SELL = 4  # must stay ACT_CLOSE_BUY + 1, see manage_position
+ACT_MODIFY_SL = 5
+
+# Event codes recorded by the core; StraddleLogic queues them and logs them off the tick path
+EVT_VELOCITY_DROP = 1
+EVT_ACTIVATE = 2
+EVT_BREACH_BUY = 3
+EVT_BREACH_SELL = 4
+EVT_STOP_BUY = 5
+EVT_STOP_SELL = 6  # must stay EVT_STOP_BUY + 1, see manage_position
+EVT_TRAIL_SL = 7
+
+_MAX_EVENTS_PER_TICK = 4
+_EVENT_QUEUE_SIZE = 65536  # oldest events are dropped if the drain task falls this far behind
+
+# Slots of the per-tick core's state vector. Everything is float64 so the state is one flat
+# array the compiled kernels can mutate in place; side and flags are stored as 0.0 / +-1.0.
+S_BUY_STOP = 0
+S_SELL_STOP = 1
+S_POS_SIDE = 2     # 0 = flat, 1 = BUY, -1 = SELL
+S_POS_ENTRY = 3
+S_POS_SL = 4
+S_PENDING_SL = 5   # trailed SL not yet sent to the broker
+S_LAST_EMIT_TS = 6
+S_HAS_LAST_TICK = 7
+S_LAST_BID = 8
+S_LAST_ASK = 9
+S_LAST_MID = 10
+S_LAST_TS = 11
+S_VELOCITY = 12
+S_IS_ACTIVE = 13
+S_N_EVENTS = 14    # events recorded by the current kernel call
+S_EVENTS = 15      # (code, value) pairs of those events
+_STATE_SIZE = S_EVENTS + 2 * _MAX_EVENTS_PER_TICK
+
+# The same slots as attributes of _PyCore, the core used without numba
+_STATE_FIELDS = (
+    'buy_stop', 'sell_stop', 'pos_side', 'pos_entry', 'pos_sl', 'pending_sl', 'last_emit_ts',
+    'has_last_tick', 'last_bid', 'last_ask', 'last_mid', 'last_ts', 'velocity', 'is_active',
+)
+
+if njit is not None:
+    # Explicit signatures make numba compile every entry point when the kernels are built,
+    # so no tick ever waits on the compiler; cache=True keeps the machine code on disk, so
+    # only the first process to see a config pays for compiling it
+    _ACTION = types.Tuple((int64, float64, float64, int64))
+    _SIG_TICK = _ACTION(float64[::1], float64, float64, float64)
+    _SIG_FLUSH_PENDING_SL = _ACTION(float64[::1], float64)
+    _SIG_RESET_CAGE = types.void(float64[::1], float64)
+    _SIG_BATCH = types.UniTuple(int64, 2)(
+        float64[::1], float64[::1], float64[::1], float64[::1],
+        int64[::1], int64[::1], float64[::1], float64[::1], float64[:, ::1])
+    _compile = functools.partial(njit, cache=True)
+else:
+    # The kernels stay plain functions; StraddleLogic runs _PyCore instead
+    _SIG_TICK = _SIG_FLUSH_PENDING_SL = _SIG_RESET_CAGE = _SIG_BATCH = None
+
+    def _compile(signature=None):
+        return lambda func: func
+
+_Kernels = collections.namedtuple(
+    '_Kernels', ['on_tick', 'on_tick_quiet', 'on_ticks', 'flush_pending_sl', 'reset_cage'])
+
+def _new_state():
+    """Fresh core state: no stops, no position, no tick seen yet."""
+    state = np.full(_STATE_SIZE, math.nan)
+    state[S_POS_SIDE] = 0.0
+    state[S_LAST_EMIT_TS] = -math.inf
+    state[S_HAS_LAST_TICK] = 0.0
+    state[S_VELOCITY] = 0.0
+    state[S_IS_ACTIVE] = 0.0
+    state[S_N_EVENTS:] = 0.0
+    return state
+
+# Core helpers shared by every config. The session constants come in as the `params` tuple
+# (gap, sl_offset, trail_start, trail_step, velocity_threshold, alpha, coalesce_s); only the
+# entry points built by _core_kernels close over them. A cached kernel that calls a closure
+# would be recompiled in every process, so the helpers must stay at module level.
+
+@_compile()
+def _record(state, code, value):
+    n = int(state[S_N_EVENTS])
+    if n < _MAX_EVENTS_PER_TICK:
+        state[S_EVENTS + 2 * n] = code
+        state[S_EVENTS + 2 * n + 1] = value
+        state[S_N_EVENTS] = n + 1
+
+@_compile()
+def _update_velocity(state, bid, ask, timestamp, params):
+    # 1. Calculate Velocity (Frequency component)
+    # Returns whether the velocity filter passes, so the pre-activation path can stop here
+    velocity_threshold, alpha = params[4], params[5]
+    mid = (bid + ask) / 2
+    velocity = state[S_VELOCITY]
+    if state[S_HAS_LAST_TICK]:
+        dt = timestamp - state[S_LAST_TS]
+        if dt > 0:
+            price_change_pips = abs(mid - state[S_LAST_MID]) * PIPS_PER_UNIT
+            current_velocity = price_change_pips / dt
+            # Smoothing
+            velocity += alpha * (current_velocity - velocity)
+            state[S_VELOCITY] = velocity
+
+    state[S_HAS_LAST_TICK] = 1.0
+    state[S_LAST_BID] = bid
+    state[S_LAST_ASK] = ask
+    state[S_LAST_MID] = mid
+    state[S_LAST_TS] = timestamp
+    return velocity >= velocity_threshold
+
+@_compile()
+def _reset_cage(state, price, gap):
+    # A NaN price leaves the cage unset
+    state[S_BUY_STOP] = price + gap
+    state[S_SELL_STOP] = price - gap
+
+@_compile()
+def _pending_sl_action(state, timestamp, coalesce_s):
+    if math.isnan(state[S_PENDING_SL]) or timestamp - state[S_LAST_EMIT_TS] < coalesce_s:
+        return ACT_NONE, math.nan, math.nan
+    sl = state[S_PENDING_SL]
+    state[S_PENDING_SL] = math.nan
+    state[S_LAST_EMIT_TS] = timestamp
+    return ACT_MODIFY_SL, math.nan, sl
+
+@_compile()
+def _manage_cage(state, bid, ask, params):
+    gap, sl_offset = params[0], params[1]
+    buy_stop = state[S_BUY_STOP]
+    sell_stop = state[S_SELL_STOP]
+
+    # Unset stops are NaN: every comparison against them is False, so no None checks
+    # Trail entries tight to price
+    # Buy Stop trails down if price drops
+    if (ask + gap) < buy_stop:
+        buy_stop = ask + gap
+
+    # Sell Stop trails up if price rises
+    if (bid - gap) > sell_stop:
+        sell_stop = bid - gap
+
+    state[S_BUY_STOP] = buy_stop
+    state[S_SELL_STOP] = sell_stop
+
+    # Check for Breaches
+    if ask >= buy_stop:
+        _record(state, EVT_BREACH_BUY, ask)
+        state[S_POS_SIDE] = 1.0
+        state[S_POS_ENTRY] = ask
+        state[S_POS_SL] = ask - sl_offset
+        state[S_PENDING_SL] = math.nan
+        state[S_LAST_EMIT_TS] = state[S_LAST_TS]  # the SL goes out with the order
+        return ACT_OPEN_BUY, ask, ask - sl_offset
+
+    if bid <= sell_stop:
+        _record(state, EVT_BREACH_SELL, bid)
+        state[S_POS_SIDE] = -1.0
+        state[S_POS_ENTRY] = bid
+        state[S_POS_SL] = bid + sl_offset
+        state[S_PENDING_SL] = math.nan
+        state[S_LAST_EMIT_TS] = state[S_LAST_TS]  # the SL goes out with the order
+        return ACT_OPEN_SELL, bid, bid + sl_offset
+
+    return ACT_NONE, math.nan, math.nan
+
+@_compile()
+def _manage_position(state, bid, ask, mid, params):
+    gap, trail_start, trail_step, coalesce_s = params[0], params[2], params[3], params[6]
+    # BUY and SELL mirror each other: fold them into one path signed by side (+1 / -1)
+    side = state[S_POS_SIDE]
+    close_price = bid if side > 0 else ask
+    sl = state[S_POS_SL]
+    is_sell = int(side < 0)
+
+    # Hard Stop Logic
+    if side * (close_price - sl) <= 0:
+        _record(state, EVT_STOP_BUY + is_sell, close_price)
+        state[S_POS_SIDE] = 0.0
+        state[S_PENDING_SL] = math.nan
+        _reset_cage(state, mid, gap)
+        return ACT_CLOSE_BUY + is_sell, math.nan, math.nan
+
+    # Trail Logic
+    if side * (close_price - state[S_POS_ENTRY]) > trail_start:
+        new_sl = close_price - side * trail_step
+        if side * (new_sl - sl) > 0:
+            state[S_POS_SL] = new_sl
+            state[S_PENDING_SL] = new_sl
+            _record(state, EVT_TRAIL_SL, new_sl)
+
+    # MODIFY_SL is coalesced: at most one per window, carrying the latest SL
+    return _pending_sl_action(state, state[S_LAST_TS], coalesce_s)
+
+@_compile()
+def _dispatch_tick(state, bid, ask, mid, params):
+    gap, velocity_threshold = params[0], params[4]
+    # 2. Check Activation (Velocity Filter)
+    velocity = state[S_VELOCITY]
+    if velocity < velocity_threshold:
+        if state[S_IS_ACTIVE] and state[S_POS_SIDE] == 0:
+            _record(state, EVT_VELOCITY_DROP, velocity)
+            _reset_cage(state, state[S_LAST_MID], gap)
+        return ACT_NONE, math.nan, math.nan
+
+    if not state[S_IS_ACTIVE]:
+        _record(state, EVT_ACTIVATE, velocity)
+        state[S_IS_ACTIVE] = 1.0
+        _reset_cage(state, mid, gap)
+
+    # 3. Manage Straddle Logic
+    if state[S_POS_SIDE] != 0:
+        return _manage_position(state, bid, ask, mid, params)
+    return _manage_cage(state, bid, ask, params)
+
+@_compile()
+def _on_tick(state, bid, ask, timestamp, params):
+    state[S_N_EVENTS] = 0.0
+    _update_velocity(state, bid, ask, timestamp, params)
+    code, price, sl = _dispatch_tick(state, bid, ask, state[S_LAST_MID], params)
+    return code, price, sl, int(state[S_N_EVENTS])
+
+@functools.lru_cache(maxsize=8)
+def _core_kernels(gap, sl_offset, trail_start, trail_step, velocity_threshold, alpha, coalesce_s):
+    """
+    Builds the per-tick core kernels for one set of session constants.
+
+    The kernels are numba-compiled functions over a state vector (see S_*); without numba
+    _PyCore stands in for them.
+    The constants are closure variables, so numba freezes them into the compiled code and
+    keys the disk cache on them. Entry points return (action_code, price, sl, n_events) and
+    reset the event count themselves; the caller never writes core state on the tick path.
+    """
+    @_compile(_SIG_TICK)
+    def on_tick(state, bid, ask, timestamp):
+        params = (gap, sl_offset, trail_start, trail_step, velocity_threshold, alpha, coalesce_s)
+        return _on_tick(state, bid, ask, timestamp, params)
+
+    @_compile(_SIG_TICK)
+    def on_tick_quiet(state, bid, ask, timestamp):
+        # Before activation only the velocity filter has to run
+        params = (gap, sl_offset, trail_start, trail_step, velocity_threshold, alpha, coalesce_s)
+        state[S_N_EVENTS] = 0.0
+        if not _update_velocity(state, bid, ask, timestamp, params):
+            return ACT_NONE, math.nan, math.nan, 0
+        code, price, sl = _dispatch_tick(state, bid, ask, state[S_LAST_MID], params)
+        return code, price, sl, int(state[S_N_EVENTS])
+
+    @_compile(_SIG_BATCH)
+    def on_ticks(state, bids, asks, timestamps, act_index, act_code, act_price, act_sl, event_log):
+        # A whole batch in one call: actions go to the act_* arrays, events to event_log as
+        # (code, timestamp, value) rows, wrapping around so only the newest rows are kept
+        params = (gap, sl_offset, trail_start, trail_step, velocity_threshold, alpha, coalesce_s)
+        n_actions = 0
+        n_logged = 0
+        log_size = event_log.shape[0]
+        for i in range(bids.shape[0]):
+            code, price, sl, n_events = _on_tick(state, bids[i], asks[i], timestamps[i], params)
+            for k in range(S_EVENTS, S_EVENTS + 2 * n_events, 2):
+                row = n_logged % log_size
+                event_log[row, 0] = state[k]
+                event_log[row, 1] = timestamps[i]
+                event_log[row, 2] = state[k + 1]
+                n_logged += 1
+            if code != ACT_NONE:
+                act_index[n_actions] = i
+                act_code[n_actions] = code
+                act_price[n_actions] = price
+                act_sl[n_actions] = sl
+                n_actions += 1
+        return n_actions, n_logged
+
+    @_compile(_SIG_FLUSH_PENDING_SL)
+    def flush_pending_sl(state, timestamp):
+        code, price, sl = _pending_sl_action(state, timestamp, coalesce_s)
+        return code, price, sl, 0
+
+    @_compile(_SIG_RESET_CAGE)
+    def reset_cage(state, price):
+        _reset_cage(state, price, gap)
+
+    return _Kernels(on_tick, on_tick_quiet, on_ticks, flush_pending_sl, reset_cage)
+
+_NO_ACTION = (ACT_NONE, math.nan, math.nan, 0)
+
+class _PyCore:
+    """
+    The tick kernels as plain-Python methods on attributes, used when numba is not installed.
+
+    The methods take the kernels' arguments with the instance in place of the state vector,
+    and indexing by an S_* slot reads the matching attribute, so StraddleLogic drives either
+    core the same way. Events are appended straight to the log queue, so n_events is always 0.
+    """
+    __slots__ = _STATE_FIELDS + (
+        'gap', 'sl_offset', 'trail_start', 'trail_step', 'velocity_threshold', 'alpha', 'coalesce_s', 'log',
+    )
+
+    def __init__(self, gap, sl_offset, trail_start, trail_step, velocity_threshold, alpha, coalesce_s, log):
+        self.gap = gap
+        self.sl_offset = sl_offset
+        self.trail_start = trail_start
+        self.trail_step = trail_step
+        self.velocity_threshold = velocity_threshold
+        self.alpha = alpha
+        self.coalesce_s = coalesce_s
+        self.log = log  # append of the (event_id, timestamp, value) queue
+
+        self.buy_stop = math.nan
+        self.sell_stop = math.nan
+        self.pos_side = 0
+        self.pos_entry = math.nan
+        self.pos_sl = math.nan
+        self.pending_sl = math.nan
+        self.last_emit_ts = -math.inf
+        self.has_last_tick = False
+        self.last_bid = math.nan
+        self.last_ask = math.nan
+        self.last_mid = math.nan
+        self.last_ts = math.nan
+        self.velocity = 0.0
+        self.is_active = False
+
+    def __getitem__(self, slot):
+        return getattr(self, _STATE_FIELDS[slot])
+
+    def on_tick(self, bid, ask, timestamp):
+        # 1. Calculate Velocity (Frequency component)
+        mid = (bid + ask) / 2
+        velocity = self.velocity
+        if self.has_last_tick:
+            dt = timestamp - self.last_ts
+            if dt > 0:
+                price_change_pips = abs(mid - self.last_mid) * PIPS_PER_UNIT
+                current_velocity = price_change_pips / dt
+                # Smoothing
+                velocity += self.alpha * (current_velocity - velocity)
+                self.velocity = velocity
+
+        self.has_last_tick = True
+        self.last_bid = bid
+        self.last_ask = ask
+        self.last_mid = mid
+        self.last_ts = timestamp
+
+        # 2. Check Activation (Velocity Filter)
+        if velocity < self.velocity_threshold:
+            if self.is_active and self.pos_side == 0:
+                self.log((EVT_VELOCITY_DROP, timestamp, velocity))
+                self.reset_cage(mid)
+            return _NO_ACTION
+
+        if not self.is_active:
+            self.log((EVT_ACTIVATE, timestamp, velocity))
+            self.is_active = True
+            self.reset_cage(mid)
+
+        # 3. Manage Straddle Logic
+        if self.pos_side != 0:
+            return self.manage_position(bid, ask, mid)
+        return self.manage_cage(bid, ask)
+
+    def reset_cage(self, price):
+        # A NaN price leaves the cage unset
+        self.buy_stop = price + self.gap
+        self.sell_stop = price - self.gap
+
+    def manage_cage(self, bid, ask):
+        gap = self.gap
+        # Unset stops are NaN: every comparison against them is False, so no None checks
+        if (ask + gap) < self.buy_stop:
+            self.buy_stop = ask + gap
+        if (bid - gap) > self.sell_stop:
+            self.sell_stop = bid - gap
+
+        if ask >= self.buy_stop:
+            self.log((EVT_BREACH_BUY, self.last_ts, ask))
+            return self.open_position(1, ask, ask - self.sl_offset, ACT_OPEN_BUY)
+        if bid <= self.sell_stop:
+            self.log((EVT_BREACH_SELL, self.last_ts, bid))
+            return self.open_position(-1, bid, bid + self.sl_offset, ACT_OPEN_SELL)
+        return _NO_ACTION
+
+    def open_position(self, side, price, sl, code):
+        self.pos_side = side
+        self.pos_entry = price
+        self.pos_sl = sl
+        self.pending_sl = math.nan
+        self.last_emit_ts = self.last_ts  # the SL goes out with the order
+        return code, price, sl, 0
+
+    def manage_position(self, bid, ask, mid):
+        # BUY and SELL mirror each other: one path signed by side (+1 / -1)
+        side = self.pos_side
+        close_price = bid if side > 0 else ask
+        sl = self.pos_sl
+
+        # Hard Stop Logic
+        if side * (close_price - sl) <= 0:
+            is_sell = int(side < 0)
+            self.log((EVT_STOP_BUY + is_sell, self.last_ts, close_price))
+            self.pos_side = 0
+            self.pending_sl = math.nan
+            self.reset_cage(mid)
+            return ACT_CLOSE_BUY + is_sell, math.nan, math.nan, 0
+
+        # Trail Logic
+        if side * (close_price - self.pos_entry) > self.trail_start:
+            new_sl = close_price - side * self.trail_step
+            if side * (new_sl - sl) > 0:
+                self.pos_sl = new_sl
+                self.pending_sl = new_sl
+                self.log((EVT_TRAIL_SL, self.last_ts, new_sl))
+
+        # MODIFY_SL is coalesced: at most one per window, carrying the latest SL
+        return self.flush_pending_sl(self.last_ts)
+
+    def flush_pending_sl(self, timestamp):
+        if math.isnan(self.pending_sl) or timestamp - self.last_emit_ts < self.coalesce_s:
+            return _NO_ACTION
+        sl = self.pending_sl
+        self.pending_sl = math.nan
+        self.last_emit_ts = timestamp
+        return ACT_MODIFY_SL, math.nan, sl, 0
+
+# Without numba the same function serves both regimes: the velocity filter already returns early
+_PY_KERNELS = _Kernels(_PyCore.on_tick, _PyCore.on_tick, None, _PyCore.flush_pending_sl, _PyCore.reset_cage)
+
 class StraddleLogic:
     """
     Core Logic for the Dynamic Straddle Scalper.
@@ -47,159 +518,445 @@ class StraddleLogic:
     1. Virtual Order Management: We do not place orders with the broker until execution.
     2. Dynamic Caging: We maintain virtual Buy Stop and Sell Stop levels that trail price.
     3. Frequency/Velocity Filter: Logic only activates when price moves fast enough.
+
+    The tick math runs in the compiled _core_kernels functions over a state vector, or in a
+    _PyCore without numba; this class translates their action codes into instruction dicts
+    and queues the events they recorded as (event_id, timestamp, value) tuples. Run drain_events() as a task (or call flush_events()) to log them.
     """
+    __slots__ = (
+        'config', '_kernels', '_on_tick_kernel', '_state', '_events',
+        '_resp_open_buy', '_resp_open_sell', '_resp_close_buy', '_resp_close_sell', '_resp_modify_sl',
+    )
+
     def __init__(self, config: StraddleConfig):
         self.config = config
-        self.virtual_buy_stop: Optional[float] = None
-        self.virtual_sell_stop: Optional[float] = None
-        self.active_position: Optional[Dict] = None  # None, 'BUY', or 'SELL'
-        self.last_tick: Optional[MarketData] = None
-        self.velocity: float = 0.0
-        self.is_active: bool = False
+
+        self._events = collections.deque(maxlen=_EVENT_QUEUE_SIZE)
+        constants = (
+            config.straddle_gap_pips * PIP_SIZE, config.stop_loss_pips * PIP_SIZE,
+            config.trailing_start_pips * PIP_SIZE, config.trailing_step_pips * PIP_SIZE,
+            config.velocity_threshold_pips, config.ema_alpha, config.emit_coalesce_s,
+        )
+        if njit is not None:
+            # Compiled (or loaded from numba's cache) here, not on the first tick
+            self._kernels = _core_kernels(*constants)
+            self._state = _new_state()
+        else:
+            self._kernels = _PY_KERNELS
+            self._state = _PyCore(*constants, self._events.append)
+
+        # Regime-selected tick kernel: the cage is latched on at first activation, so
+        # until then only the velocity filter has to run
+        self._on_tick_kernel = self._kernels.on_tick_quiet
+
+        # Preallocated instruction dicts, refilled on every trigger instead of allocated
+        self._resp_open_buy = {'action': 'OPEN_BUY', 'price': 0.0, 'sl': 0.0}
+        self._resp_open_sell = {'action': 'OPEN_SELL', 'price': 0.0, 'sl': 0.0}
+        self._resp_close_buy = {'action': 'CLOSE_BUY'}
+        self._resp_close_sell = {'action': 'CLOSE_SELL'}
+        self._resp_modify_sl = {'action': 'MODIFY_SL', 'sl': 0.0}
+
+    @property
+    def velocity(self) -> float:
+        return float(self._state[S_VELOCITY])
+
+    @property
+    def is_active(self) -> bool:
+        return bool(self._state[S_IS_ACTIVE])
+
+    @property
+    def virtual_buy_stop(self) -> Optional[float]:
+        price = float(self._state[S_BUY_STOP])
+        return None if math.isnan(price) else price
+
+    @property
+    def virtual_sell_stop(self) -> Optional[float]:
+        price = float(self._state[S_SELL_STOP])
+        return None if math.isnan(price) else price
+
+    @property
+    def active_position(self) -> Optional[Dict]:
+        """Open position as a dict; built on access only, the core keeps it as scalars."""
+        state = self._state
+        if state[S_POS_SIDE] == 0:
+            return None
+        return {'side': 'BUY' if state[S_POS_SIDE] > 0 else 'SELL',
+                'entry': float(state[S_POS_ENTRY]), 'sl': float(state[S_POS_SL])}
+
+    @property
+    def last_tick(self) -> Optional[MarketData]:
+        state = self._state
+        if not state[S_HAS_LAST_TICK]:
+            return None
+        return MarketData(float(state[S_LAST_BID]), float(state[S_LAST_ASK]), float(state[S_LAST_TS]))
 
     def on_tick(self, tick: MarketData) -> Optional[Dict]:
         """
         Process a new tick. Returns an order instruction if triggered.
+
+        The instruction dict is reused across ticks: serialize or copy it before the next call.
         """
-        # 1. Calculate Velocity (Frequency component)
-        if self.last_tick:
-            dt = tick.timestamp - self.last_tick.timestamp
-            if dt > 0:
-                price_change_pips = abs(tick.mid - self.last_tick.mid) * 10000 # Assuming 4 digit broker for simplicity
-                current_velocity = price_change_pips / dt
-                # Smoothing
-                self.velocity = (self.velocity * 0.7) + (current_velocity * 0.3)
-        
-        self.last_tick = tick
+        code, price, sl, n_events = self._on_tick_kernel(self._state, tick.bid, tick.ask, tick.timestamp)
+        if n_events:
+            # Activation always records an event, so this is where the full kernel takes over
+            self._on_tick_kernel = self._kernels.on_tick
+            self._collect_events(n_events)
+        if code:
+            return self._instruction(code, price, sl)
+        return None
 
-        # 2. Check Activation (Velocity Filter)
-        if self.velocity < self.config.velocity_threshold_pips:
-            if self.is_active and not self.active_position:
-                logger.info(f"Velocity dropped ({self.velocity:.2f} < {self.config.velocity_threshold_pips}). Resetting cage.")
-                self.reset_cage()
-            return None
+    def on_ticks_batch(self, bids: np.ndarray, asks: np.ndarray, timestamps: np.ndarray) -> List[Tuple[int, Dict]]:
+        """
+        Process a batch of ticks. Returns (index, instruction) pairs for every tick that triggered one.
+        The columns of a TickRing.drain() slice can be passed straight in.
 
-        if not self.is_active:
-            logger.info(f"High Frequency Detected ({self.velocity:.2f}). Activating Cage.")
-            self.is_active = True
-            self.reset_cage(tick.mid)
+        With numba the whole batch runs through the compiled tick kernel in a single call;
+        otherwise it is the on_tick loop without the per-tick MarketData.
+        """
+        bids = np.ascontiguousarray(bids, dtype=np.float64)
+        asks = np.ascontiguousarray(asks, dtype=np.float64)
+        timestamps = np.ascontiguousarray(timestamps, dtype=np.float64)
+        if len(bids) == 0:
+            return []
 
-        # 3. Manage Straddle Logic
-        if self.active_position:
-            return self._manage_position(tick)
+        if njit is not None:
+            actions = self._on_ticks_compiled(bids, asks, timestamps)
         else:
-            return self._manage_cage(tick)
+            actions = self._on_ticks_loop(bids, asks, timestamps)
+        if self._state[S_IS_ACTIVE]:
+            self._on_tick_kernel = self._kernels.on_tick
+        return actions
+
+    def _on_ticks_loop(self, bids: np.ndarray, asks: np.ndarray, timestamps: np.ndarray) -> List[Tuple[int, Dict]]:
+        """Feeds the batch through the tick kernel one row at a time (the path without numba)."""
+        actions: List[Tuple[int, Dict]] = []
+        state = self._state
+        for i, (bid, ask, timestamp) in enumerate(zip(bids.tolist(), asks.tolist(), timestamps.tolist())):
+            code, price, sl, n_events = self._on_tick_kernel(state, bid, ask, timestamp)
+            if n_events:
+                self._on_tick_kernel = self._kernels.on_tick
+                self._collect_events(n_events)
+            if code:
+                actions.append((i, self._instruction(code, price, sl).copy()))
+        return actions
+
+    def _on_ticks_compiled(self, bids: np.ndarray, asks: np.ndarray, timestamps: np.ndarray) -> List[Tuple[int, Dict]]:
+        """Runs the batch through the on_ticks kernel and turns its output arrays into actions and log events."""
+        n = len(bids)
+        act_index = np.empty(n, dtype=np.int64)
+        act_code = np.empty(n, dtype=np.int64)
+        act_price = np.empty(n)
+        act_sl = np.empty(n)
+        event_log = np.empty((min(n * _MAX_EVENTS_PER_TICK, _EVENT_QUEUE_SIZE), 3))
+        n_actions, n_logged = self._kernels.on_ticks(
+            self._state, bids, asks, timestamps, act_index, act_code, act_price, act_sl, event_log)
+
+        if n_logged:
+            log_size = len(event_log)
+            if n_logged <= log_size:
+                rows = event_log[:n_logged]
+            else:
+                # The log wrapped: its oldest row sits just past the last one written
+                start = n_logged % log_size
+                rows = np.concatenate((event_log[start:], event_log[:start]))
+            self._events.extend(map(tuple, rows.tolist()))
+
+        instruction = self._instruction
+        return [
+            (i, instruction(code, price, sl).copy())
+            for i, code, price, sl in zip(act_index[:n_actions].tolist(), act_code[:n_actions].tolist(),
+                                          act_price[:n_actions].tolist(), act_sl[:n_actions].tolist())
+        ]
+
+    def flush_pending_sl(self, timestamp: Optional[float] = None) -> Optional[Dict]:
+        """
+        Heartbeat hook: returns the coalesced MODIFY_SL once the emit window has passed.
+
+        Ticks flush pending stops themselves, so this only matters when the feed goes quiet
+        (or slows below the velocity filter) with a trailed stop still unsent. timestamp must
+        be on the same clock as the tick timestamps; it defaults to monotonic().
+        """
+        if timestamp is None:
+            timestamp = _monotonic()
+        code, price, sl, _ = self._kernels.flush_pending_sl(self._state, timestamp)
+        return self._instruction(code, price, sl)
 
     def reset_cage(self, current_price: float = None):
         """Resets virtual stops around current price."""
-        if current_price is None and self.last_tick:
-            current_price = self.last_tick.mid
-        
-        if current_price:
-            gap = self.config.straddle_gap_pips / 10000
-            self.virtual_buy_stop = current_price + gap
-            self.virtual_sell_stop = current_price - gap
-        else:
-            self.virtual_buy_stop = None
-            self.virtual_sell_stop = None
-
-    def _manage_cage(self, tick: MarketData) -> Optional[Dict]:
-        """Trails the virtual stops until one is hit."""
-        gap = self.config.straddle_gap_pips / 10000
-        
-        # Trail entries tight to price
-        # Buy Stop trails down if price drops
-        if self.virtual_buy_stop and (tick.ask + gap) < self.virtual_buy_stop:
-            self.virtual_buy_stop = tick.ask + gap
-            
-        # Sell Stop trails up if price rises
-        if self.virtual_sell_stop and (tick.bid - gap) > self.virtual_sell_stop:
-            self.virtual_sell_stop = tick.bid - gap
-
-        # Check for Breaches
-        if self.virtual_buy_stop and tick.ask >= self.virtual_buy_stop:
-            logger.info(f"Virtual BUY STOP triggered at {tick.ask}")
-            self.active_position = {'side': 'BUY', 'entry': tick.ask, 'sl': tick.ask - (self.config.stop_loss_pips/10000)}
-            return {'action': 'OPEN_BUY', 'price': tick.ask, 'sl': self.active_position['sl']}
-
-        if self.virtual_sell_stop and tick.bid <= self.virtual_sell_stop:
-            logger.info(f"Virtual SELL STOP triggered at {tick.bid}")
-            self.active_position = {'side': 'SELL', 'entry': tick.bid, 'sl': tick.bid + (self.config.stop_loss_pips/10000)}
-            return {'action': 'OPEN_SELL', 'price': tick.bid, 'sl': self.active_position['sl']}
-            
-        return None
+        if current_price is None:
+            current_price = float(self._state[S_LAST_MID])
+        self._kernels.reset_cage(self._state, current_price if current_price else math.nan)
 
-    def _manage_position(self, tick: MarketData) -> Optional[Dict]:
-        """Manages an active position (Trailing Stop)."""
-        if not self.active_position:
+    def _instruction(self, code: int, price: float, sl: float) -> Optional[Dict]:
+        """Translates a core action code into the (reused) order instruction dict."""
+        if code == ACT_NONE:
             return None
-            
-        pips = 0.0001
-        sl = self.active_position['sl']
-        
-        if self.active_position['side'] == 'BUY':
-            profit = tick.bid - self.active_position['entry']
-            # Hard Stop Logic
-            if tick.bid <= sl:
-                logger.info("STOP LOSS hit (BUY)")
-                self.active_position = None
-                self.reset_cage(tick.mid)
-                return {'action': 'CLOSE_BUY'}
-            
-            # Trail Logic
-            if profit > (self.config.trailing_start_pips * pips):
-                new_sl = tick.bid - (self.config.trailing_step_pips * pips)
-                if new_sl > sl:
-                    self.active_position['sl'] = new_sl
-                    logger.info(f"Trailing SL Updated to {new_sl}")
-                    return {'action': 'MODIFY_SL', 'sl': new_sl}
-
-        elif self.active_position['side'] == 'SELL':
-            profit = self.active_position['entry'] - tick.ask
-             # Hard Stop Logic
-            if tick.ask >= sl:
-                logger.info("STOP LOSS hit (SELL)")
-                self.active_position = None
-                self.reset_cage(tick.mid)
-                return {'action': 'CLOSE_SELL'}
-                
-            # Trail Logic
-            if profit > (self.config.trailing_start_pips * pips):
-                new_sl = tick.ask + (self.config.trailing_step_pips * pips)
-                if new_sl < sl:
-                    self.active_position['sl'] = new_sl
-                    logger.info(f"Trailing SL Updated to {new_sl}")
-                    return {'action': 'MODIFY_SL', 'sl': new_sl}
+        if code == ACT_OPEN_BUY:
+            response = self._resp_open_buy
+            response['price'] = price
+            response['sl'] = sl
+            return response
+        if code == ACT_OPEN_SELL:
+            response = self._resp_open_sell
+            response['price'] = price
+            response['sl'] = sl
+            return response
+        if code == ACT_CLOSE_BUY:
+            return self._resp_close_buy
+        if code == ACT_CLOSE_SELL:
+            return self._resp_close_sell
+        response = self._resp_modify_sl
+        response['sl'] = sl
+        return response
 
-        return None
+    def _collect_events(self, n_events: int):
+        """Moves the n_events the last kernel call recorded into the deferred log queue."""
+        # Raw state values; flush_events converts them to int / float when it logs them
+        state = self._state
+        timestamp = state[S_LAST_TS]
+        append = self._events.append
+        append((state[S_EVENTS], timestamp, state[S_EVENTS + 1]))
+        for k in range(S_EVENTS + 2, S_EVENTS + 2 * n_events, 2):
+            append((state[k], timestamp, state[k + 1]))
+
+    def flush_events(self):
+        """Formats and logs every queued event."""
+        events = self._events
+        while events:
+            code, timestamp, value = events.popleft()
+            self._log_event(int(code), float(timestamp), float(value))
+
+    async def drain_events(self, interval: float = 0.1):
+        """Background task that flushes the event queue every `interval` seconds until cancelled."""
+        try:
+            while True:
+                await asyncio.sleep(interval)
+                self.flush_events()
+        finally:
+            self.flush_events()
+
+    def _log_event(self, code: int, timestamp: float, value: float):
+        if code == EVT_VELOCITY_DROP:
+            logger.info(f"[t={timestamp:.3f}] Velocity dropped ({value:.2f} < {self.config.velocity_threshold_pips}). Resetting cage.")
+        elif code == EVT_ACTIVATE:
+            logger.info(f"[t={timestamp:.3f}] High Frequency Detected ({value:.2f}). Activating Cage.")
+        elif code == EVT_BREACH_BUY:
+            logger.info(f"[t={timestamp:.3f}] Virtual BUY STOP triggered at {value}")
+        elif code == EVT_BREACH_SELL:
+            logger.info(f"[t={timestamp:.3f}] Virtual SELL STOP triggered at {value}")
+        elif code == EVT_STOP_BUY:
+            logger.info(f"[t={timestamp:.3f}] STOP LOSS hit (BUY)")
+        elif code == EVT_STOP_SELL:
+            logger.info(f"[t={timestamp:.3f}] STOP LOSS hit (SELL)")
+        elif code == EVT_TRAIL_SL:
+            logger.info(f"[t={timestamp:.3f}] Trailing SL Updated to {value}")
+
+class TickRing:
+    """
+    Lock-free single-producer / single-consumer ring of (bid, ask, timestamp) rows in shared memory.
+
+    The feed handler (producer, possibly in another process attached by name) writes a row
+    and then publishes the tail index; the strategy (consumer) copies out a whole slice and
+    then publishes the head index. Each index has exactly one writer, so no lock is needed.
+    Python has no explicit release/acquire fences: publication order relies on CPython
+    executing the stores in program order and on x86 not reordering stores. Weakly ordered
+    CPUs (ARM, POWER) give no such guarantee, so the ring warns when created there.
+    """
+    __slots__ = ('capacity', '_shm', '_head', '_tail', '_rows')
+
+    # Total-store-order machines, where a row is visible before the index that publishes it
+    _STORE_ORDERED_MACHINES = frozenset({'x86_64', 'amd64', 'i386', 'i686', 'x86'})
+
+    # head, tail and capacity live on separate 64-byte cache lines ahead of the rows
+    _HEAD_OFFSET = 0
+    _TAIL_OFFSET = 64
+    _CAPACITY_OFFSET = 128
+    _ROWS_OFFSET = 192
+
+    def __init__(self, capacity: int = 65536, name: Optional[str] = None):
+        """
+        Create a new ring, or attach to an existing one when `name` is given.
+
+        Attached rings never unlink the segment: the creating process owns it and calls unlink().
+        """
+        machine = platform.machine()
+        if machine.lower() not in self._STORE_ORDERED_MACHINES:
+            warnings.warn(
+                f"TickRing relies on x86 store ordering; on {machine or 'this machine'} the consumer "
+                "may read a row before the producer's write to it is visible",
+                RuntimeWarning, stacklevel=2)
+        if name is None:
+            self._shm = shared_memory.SharedMemory(create=True, size=self._ROWS_OFFSET + capacity * 3 * 8)
+        elif sys.version_info >= (3, 13):
+            self._shm = shared_memory.SharedMemory(name=name, track=False)
+        else:
+            self._shm = shared_memory.SharedMemory(name=name)
+            # Attaching registers the segment with this process's resource tracker, which would
+            # unlink it when this process exits; only the creator owns the segment's lifetime
+            resource_tracker.unregister(self._shm._name, "shared_memory")
+        buf = self._shm.buf
+        self._head = np.ndarray((1,), dtype=np.uint64, buffer=buf, offset=self._HEAD_OFFSET)
+        self._tail = np.ndarray((1,), dtype=np.uint64, buffer=buf, offset=self._TAIL_OFFSET)
+        stored_capacity = np.ndarray((1,), dtype=np.uint64, buffer=buf, offset=self._CAPACITY_OFFSET)
+        if name is None:
+            self._head[0] = 0
+            self._tail[0] = 0
+            stored_capacity[0] = capacity
+        self.capacity = int(stored_capacity[0])
+        self._rows = np.ndarray((self.capacity, 3), dtype=np.float64, buffer=buf, offset=self._ROWS_OFFSET)
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def __len__(self) -> int:
+        return int(self._tail[0]) - int(self._head[0])
+
+    def push(self, bid: float, ask: float, timestamp: float) -> bool:
+        """Producer side: append one tick. Returns False (tick dropped) when the ring is full."""
+        tail = int(self._tail[0])
+        if tail - int(self._head[0]) >= self.capacity:
+            return False
+        self._rows[tail % self.capacity] = (bid, ask, timestamp)
+        self._tail[0] = tail + 1  # publish only after the row is written
+        return True
+
+    def drain(self, max_ticks: Optional[int] = None) -> np.ndarray:
+        """Consumer side: copy out up to `max_ticks` pending rows as an (n, 3) array and free them."""
+        head = int(self._head[0])
+        n = int(self._tail[0]) - head
+        if max_ticks is not None:
+            n = min(n, max_ticks)
+        if n <= 0:
+            return np.empty((0, 3))
+        start = head % self.capacity
+        end = start + n
+        if end <= self.capacity:
+            batch = self._rows[start:end].copy()
+        else:
+            batch = np.concatenate((self._rows[start:], self._rows[:end - self.capacity]))
+        self._head[0] = head + n  # release the slots only after they are copied
+        return batch
+
+    def close(self):
+        """Detach from the shared memory; the creator should also call unlink()."""
+        self._head = self._tail = self._rows = None  # views must go before the buffer closes
+        self._shm.close()
+
+    def unlink(self):
+        self._shm.unlink()
+
+async def run_engine(bot: StraddleLogic, ring: TickRing, stop: asyncio.Event,
+                     on_action=None, max_batch: int = 256, idle_sleep: float = 0.001) -> int:
+    """
+    Single iterative tick-drain task: pull up to `max_batch` ticks from the ring, run them
+    through the bot, and only yield to the event loop when the ring is empty.
+
+    The drained slice goes through on_ticks_batch: one compiled call with numba, the per-tick
+    kernel in a loop without it.
+
+    An empty ring first just yields, then the wait doubles up to `idle_sleep` seconds, so a
+    quiet feed does not keep a core spinning while a busy one adds no latency. idle_sleep=0
+    polls continuously.
+
+    While the ring is empty the bot's coalesced MODIFY_SL is flushed on the tick clock (the
+    last tick's timestamp plus the time since it was drained), so a trailed stop still goes
+    out when the feed goes quiet, whatever epoch the feed stamps its ticks in.
+
+    on_action(tick_index, row, instruction) is called for every triggered instruction; the
+    instruction may be reused once the callback returns. Flushed stops are reported against
+    the last processed tick.
+    Returns the number of ticks processed once `stop` is set and the ring is drained.
+    """
+    processed = 0
+    last_row = None
+    drained_at = 0.0
+    idle = 0.0
+    while True:
+        # Read the flag before draining so ticks pushed just before stop are not lost
+        stopping = stop.is_set()
+        batch = ring.drain(max_batch)
+        if not len(batch):
+            if last_row is not None:
+                instruction = bot.flush_pending_sl(float(last_row[2]) + (_monotonic() - drained_at))
+                if instruction is not None and on_action is not None:
+                    on_action(processed - 1, last_row, instruction)
+            if stopping:
+                return processed
+            await asyncio.sleep(idle)
+            idle = min(idle_sleep, idle * 2 or idle_sleep / 64)
+            continue
+
+        drained_at = _monotonic()
+        idle = 0.0
+        for i, instruction in bot.on_ticks_batch(batch[:, 0], batch[:, 1], batch[:, 2]):
+            if on_action is not None:
+                on_action(processed + i, batch[i], instruction)
+        processed += len(batch)
+        last_row = batch[-1]
 
 # --- Mock Integration for Testing ---
-async def run_simulation():
+async def run_simulation(pace_seconds: float = 0.0, tick_spacing: float = 1.0):
+    """Replays a synthetic news spike. pace_seconds > 0 throttles ticks to a live-like rate."""
     config = StraddleConfig(velocity_threshold_pips=0.1)
     bot = StraddleLogic(config)
-    
+    ring = TickRing(capacity=1024)
+    stop = asyncio.Event()
+    drain = asyncio.create_task(bot.drain_events())
+
+    def print_action(i, row, instruction):
+        print(f"T={i} | Price={row[0]:.5f} | Action={instruction}")
+
+    engine = asyncio.create_task(run_engine(bot, ring, stop, on_action=print_action))
+
     # Simulate a price spike (High Frequency Event)
     price = 1.1000
     print("Starting Simulation...")
-    
-    for i in range(20):
-        # Normal low vol
-        if i < 5:
-            price += 0.00002
-        # EXPLOSION (News event)
-        elif 5 <= i < 10:
-            price += 0.0005 # 5 pips per tick jump!
-        # Reversion
-        elif 10 <= i < 15:
-            price -= 0.0002
-        else:
-            price += 0.00005
-            
-        tick = MarketData(bid=price, ask=price+0.0001, timestamp=time.time() + i)
-        action = bot.on_tick(tick)
-        
-        print(f"T={i} | Price={price:.5f} | Vel={bot.velocity:.2f} | Active={bot.is_active} | Action={action}")
-        await asyncio.sleep(0.1)
+    start = _monotonic()
+
+    try:
+        for i in range(20):
+            # Normal low vol
+            if i < 5:
+                price += 0.00002
+            # EXPLOSION (News event)
+            elif 5 <= i < 10:
+                price += 0.0005 # 5 pips per tick jump!
+            # Reversion
+            elif 10 <= i < 15:
+                price -= 0.0002
+            else:
+                price += 0.00005
+
+            while not ring.push(price, price + 0.0001, start + i * tick_spacing):
+                await asyncio.sleep(0)  # ring full: let the engine catch up
+            if pace_seconds:
+                await asyncio.sleep(pace_seconds)
+
+        stop.set()
+        processed = await engine
+        print(f"Processed {processed} ticks | Vel={bot.velocity:.2f} | Active={bot.is_active}")
+    finally:
+        drain.cancel()
+        try:
+            await drain
+        except asyncio.CancelledError:
+            pass
+        ring.close()
+        ring.unlink()
+
+def main():
+    if uvloop is None:
+        asyncio.run(run_simulation())
+        return
+
+    loop = uvloop.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        loop.run_until_complete(run_simulation())
+    finally:
+        asyncio.set_event_loop(None)
+        loop.close()
 
 if __name__ == "__main__":
-    asyncio.run(run_simulation())
+    main()
@@ -1,53 +1,142 @@
 #!/usr/bin/env python3
 """
 PDF Text Extraction Tool
-Extracts text content from PDF files using PyPDF2
+Extracts text content from PDF files using pypdfium2 (PDFium), falling back to PyPDF2
 """
 
+import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
+
+__requires__ = ("pypdfium2>=4",)
+
 try:
-    from PyPDF2 import PdfReader
+    import pypdfium2 as pdfium
 except ImportError:
-    print("PyPDF2 not installed. Installing...")
+    pdfium = None
+
+PdfReader = None
+if pdfium is None:
+    try:
+        # Pure-Python fallback, several times slower per page
+        from PyPDF2 import PdfReader
+    except ImportError:
+        pass
+
+MISSING_BACKEND_MESSAGE = (
+    "No PDF backend available. Install pypdfium2 with "
+    "'pip install -r requirements.txt' or rerun with --install."
+)
+
+def install_requirements():
+    """pip-install __requires__ into the running interpreter (only on explicit --install)"""
+    global pdfium
     import subprocess
-    subprocess.check_call([sys.executable, "-m", "pip", "install", "PyPDF2"])
-    from PyPDF2 import PdfReader
+    subprocess.check_call([sys.executable, "-m", "pip", "install", *__requires__])
+    import pypdfium2 as pdfium
+
+def _open_pdf(pdf_path):
+    """Open a PDF with whichever backend is available"""
+    if pdfium is not None:
+        return pdfium.PdfDocument(pdf_path)
+    if PdfReader is None:
+        raise ImportError(MISSING_BACKEND_MESSAGE)
+    return PdfReader(pdf_path)
 
-def extract_pdf_text(pdf_path):
-    """Extract all text from a PDF file"""
+def _page_count(document):
+    if pdfium is not None:
+        return len(document)
+    return len(document.pages)
+
+# Starting a worker and opening the document in it costs about as much as extracting
+# 4-5 pages of text (~6 ms vs ~1.5 ms per page, measured on Linux/fork; spawn is slower),
+# so only split the work once every worker gets at least this many pages
+_MIN_PAGES_PER_WORKER = 32
+
+# Per-worker document, opened once by _init_worker so each page task only extracts
+# (set directly when pages are extracted in-process)
+_document = None
+
+def _init_worker(pdf_path):
+    global _document
+    _document = _open_pdf(pdf_path)
+
+def _extract_page(page_index):
+    """Extract the text of one page using the worker's document"""
+    if pdfium is None:
+        return _document.pages[page_index].extract_text()
+
+    page = _document[page_index]
+    textpage = page.get_textpage()
     try:
-        reader = PdfReader(pdf_path)
-        text_content = []
-        
-        print(f"Reading PDF: {pdf_path}")
-        print(f"Total pages: {len(reader.pages)}\n")
-        print("=" * 80)
-        
-        for page_num, page in enumerate(reader.pages, 1):
-            text = page.extract_text()
-            text_content.append(f"\n--- PAGE {page_num} ---\n{text}")
-        
-        full_text = "\n".join(text_content)
-        print(full_text)
-        
-        # Also save to a text file
+        # PDFium ends lines with CRLF; keep the output's plain newlines
+        return textpage.get_text_range().replace("\r\n", "\n")
+    finally:
+        textpage.close()
+        page.close()
+
+def _write_pages(f, pages):
+    for page_num, text in enumerate(pages, 1):
+        if page_num > 1:
+            f.write("\n")
+        f.write(f"\n--- PAGE {page_num} ---\n")
+        f.write(text)
+
+def extract_pdf_text(pdf_path, max_workers=None):
+    """Extract all text from a PDF file, streaming each page to <name>_extracted.txt"""
+    global _document
+    try:
+        document = _open_pdf(pdf_path)
+        page_count = _page_count(document)
         output_file = pdf_path.replace('.pdf', '_extracted.txt')
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write(full_text)
-        
-        print("\n" + "=" * 80)
-        print(f"\nText saved to: {output_file}")
-        
-        return full_text
-        
+
+        print(f"Reading PDF: {pdf_path}")
+        print(f"Total pages: {page_count}")
+
+        workers = min(max_workers or os.cpu_count() or 1, page_count // _MIN_PAGES_PER_WORKER)
+
+        # Write pages as they arrive instead of holding the whole document in memory
+        with open(output_file, 'w', encoding='utf-8', buffering=1 << 20) as f:
+            if workers < 2:
+                # Too few pages to pay for starting worker processes: extract in-process
+                _document = document
+                try:
+                    _write_pages(f, map(_extract_page, range(page_count)))
+                finally:
+                    _document = None
+                    if pdfium is not None:
+                        document.close()
+            else:
+                if pdfium is not None:
+                    document.close()
+                with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                         initargs=(pdf_path,)) as executor:
+                    # Pages are independent, so extract them in parallel; map() keeps page order
+                    _write_pages(f, executor.map(_extract_page, range(page_count)))
+
+        print(f"Extracted {page_count} pages → {output_file}")
+
+        return output_file
+
     except Exception as e:
         print(f"Error extracting PDF: {e}")
         return None
 
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python extract_pdf.py <path_to_pdf>")
+    args = sys.argv[1:]
+    if "--install" in args:
+        args.remove("--install")
+        install_requirements()
+        if not args:
+            sys.exit(0)
+
+    if len(args) < 1:
+        print("Usage: python extract_pdf.py [--install] <path_to_pdf>")
         sys.exit(1)
-    
-    pdf_path = sys.argv[1]
+
+    if pdfium is None and PdfReader is None:
+        print(MISSING_BACKEND_MESSAGE)
+        sys.exit(1)
+
+    pdf_path = args[0]
     extract_pdf_text(pdf_path)
@@ -0,0 +1,105 @@
+import importlib.util
+import os
+import runpy
+import subprocess
+import sys
+
+import pytest
+
+SCRIPT = os.path.join(os.path.dirname(__file__), '..', 'extract_pdf.py')
+
+sys.path.insert(0, os.path.dirname(SCRIPT))
+
+import extract_pdf
+
+PAGES = ['Page one', 'Page two', 'Page three']
+
+
+def make_pdf(path, texts):
+    """Writes a minimal PDF with one line of Helvetica text per page."""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None,
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in texts:
+        stream = b"BT /F1 12 Tf 72 720 Td (" + text.encode() + b") Tj ET"
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objects))
+        kids.append(b"%d 0 R" % len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(kids), len(kids))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    path.write_bytes(bytes(out))
+    return str(path)
+
+
+def expected_output(texts):
+    # The layout of the original single-pass extractor
+    return "\n".join(f"\n--- PAGE {page_num} ---\n{text}" for page_num, text in enumerate(texts, 1))
+
+
+def load_without(monkeypatch, *blocked):
+    """Imports a fresh copy of extract_pdf with the given backend modules unavailable."""
+    for name in blocked:
+        monkeypatch.setitem(sys.modules, name, None)
+    spec = importlib.util.spec_from_file_location('extract_pdf_fallback', SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def read(path):
+    with open(path, encoding='utf-8') as f:
+        return f.read()
+
+
+@pytest.mark.skipif(extract_pdf.pdfium is None, reason='pypdfium2 is not installed')
+def test_output_format(tmp_path):
+    output_file = extract_pdf.extract_pdf_text(make_pdf(tmp_path / 'doc.pdf', PAGES))
+    assert output_file == str(tmp_path / 'doc_extracted.txt')
+    assert read(output_file) == expected_output(PAGES)
+
+
+@pytest.mark.skipif(extract_pdf.pdfium is None, reason='pypdfium2 is not installed')
+def test_worker_pool_matches_in_process(tmp_path, monkeypatch):
+    texts = [f'Page {i}' for i in range(1, 9)]
+    pdf_path = make_pdf(tmp_path / 'doc.pdf', texts)
+    monkeypatch.setattr(extract_pdf, '_MIN_PAGES_PER_WORKER', 2)
+    assert read(extract_pdf.extract_pdf_text(pdf_path, max_workers=3)) == expected_output(texts)
+
+
+def test_pypdf2_fallback(tmp_path, monkeypatch):
+    pytest.importorskip('PyPDF2')
+    module = load_without(monkeypatch, 'pypdfium2')
+    assert module.pdfium is None and module.PdfReader is not None
+    output_file = module.extract_pdf_text(make_pdf(tmp_path / 'doc.pdf', PAGES))
+    assert read(output_file) == expected_output(PAGES)
+
+
+def test_install_flag(monkeypatch):
+    pytest.importorskip('pypdfium2')  # the mocked pip installs nothing, so the import needs it present
+    calls = []
+    monkeypatch.setattr(subprocess, 'check_call', calls.append)
+    monkeypatch.setattr(sys, 'argv', ['extract_pdf.py', '--install'])
+    with pytest.raises(SystemExit) as exit_info:
+        runpy.run_path(SCRIPT, run_name='__main__')
+    assert exit_info.value.code == 0
+    assert calls == [[sys.executable, '-m', 'pip', 'install', 'pypdfium2>=4']]
+
+
+def test_missing_backend_exits(tmp_path, monkeypatch, capsys):
+    monkeypatch.setitem(sys.modules, 'pypdfium2', None)
+    monkeypatch.setitem(sys.modules, 'PyPDF2', None)
+    monkeypatch.setattr(sys, 'argv', ['extract_pdf.py', str(tmp_path / 'doc.pdf')])
+    with pytest.raises(SystemExit) as exit_info:
+        runpy.run_path(SCRIPT, run_name='__main__')
+    assert exit_info.value.code == 1
+    assert extract_pdf.MISSING_BACKEND_MESSAGE in capsys.readouterr().out
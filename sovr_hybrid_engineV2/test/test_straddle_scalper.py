@@ -0,0 +1,267 @@
+import asyncio
+import logging
+import os
+import random
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'agents'))
+
+import straddle_scalper as ss
+
+logging.disable(logging.CRITICAL)
+
+
+def make_ticks(seed, n=3000):
+    """Random walk cycling through calm, fast and medium regimes, with some repeated timestamps."""
+    rng = random.Random(seed)
+    price, timestamp = 1.1, 1000.0
+    ticks = []
+    for i in range(n):
+        price += rng.gauss(0, [0.00001, 0.0004, 0.0001][(i // 50) % 3])
+        timestamp += rng.choice([0.5, 1.0, 1.0, 0.0, 2.0])
+        ticks.append((price, price + 0.0001, timestamp))
+    return np.array(ticks)
+
+
+def make_bot():
+    return ss.StraddleLogic(ss.StraddleConfig(velocity_threshold_pips=0.3))
+
+
+def snapshot(bot):
+    return (bot.velocity, bot.is_active, bot.virtual_buy_stop, bot.virtual_sell_stop,
+            bot.active_position, bot.last_tick.timestamp)
+
+
+def run_ticks(bot, ticks):
+    actions = []
+    for i, (bid, ask, timestamp) in enumerate(ticks):
+        action = bot.on_tick(ss.MarketData(bid, ask, timestamp))
+        if action:
+            actions.append((i, action.copy()))
+    return actions
+
+
+def run_scalar(ticks):
+    bot = make_bot()
+    return bot, run_ticks(bot, ticks)
+
+
+def trail_ticks(start, *bids_and_offsets):
+    """Activates, opens a BUY at tick 2 (timestamp start + 2) and trails its SL on every later tick."""
+    rows = [(1.1000, 0.0), (1.1010, 1.0), (1.1020, 2.0)] + list(bids_and_offsets)
+    return [(bid, bid + 0.0001, start + offset) for bid, offset in rows]
+
+
+def make_trail_bot(emit_coalesce_s):
+    return ss.StraddleLogic(ss.StraddleConfig(velocity_threshold_pips=0.1, emit_coalesce_s=emit_coalesce_s))
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+@pytest.mark.parametrize('batch_size', [1, 7, 256, 3000])
+def test_batch_matches_scalar(seed, batch_size):
+    ticks = make_ticks(seed)
+    scalar_bot, scalar_actions = run_scalar(ticks)
+
+    bot = make_bot()
+    actions = []
+    for start in range(0, len(ticks), batch_size):
+        chunk = ticks[start:start + batch_size]
+        actions.extend((start + i, action) for i, action in bot.on_ticks_batch(chunk[:, 0], chunk[:, 1], chunk[:, 2]))
+
+    assert actions == scalar_actions
+    assert snapshot(bot) == snapshot(scalar_bot)
+    assert list(bot._events) == list(scalar_bot._events)
+
+
+def test_ring_drain_wraps_around():
+    ring = ss.TickRing(capacity=8)
+    try:
+        for i in range(6):
+            assert ring.push(float(i), i + 0.5, 1000.0 + i)
+        assert ring.drain(5)[:, 0].tolist() == [0.0, 1.0, 2.0, 3.0, 4.0]
+
+        # Rows 5..12 occupy slots 5, 6, 7, 0, 1, 2, 3, 4: the next drain spans the end of the buffer
+        for i in range(6, 13):
+            assert ring.push(float(i), i + 0.5, 1000.0 + i)
+        assert not ring.push(13.0, 13.5, 1013.0)
+        batch = ring.drain()
+        assert batch[:, 0].tolist() == [float(i) for i in range(5, 13)]
+        assert (batch[:, 1] == batch[:, 0] + 0.5).all()
+        assert (batch[:, 2] == batch[:, 0] + 1000.0).all()
+        assert len(ring) == 0
+        assert len(ring.drain()) == 0
+    finally:
+        ring.close()
+        ring.unlink()
+
+
+def test_ring_warns_without_store_ordering(monkeypatch):
+    monkeypatch.setattr(ss.platform, 'machine', lambda: 'aarch64')
+    with pytest.warns(RuntimeWarning, match='aarch64'):
+        ring = ss.TickRing(capacity=8)
+    ring.close()
+    ring.unlink()
+
+
+def test_ring_survives_attached_process_exit():
+    ring = ss.TickRing(capacity=8)
+    try:
+        # A separate interpreter has its own resource tracker, which must not unlink the segment
+        # when it exits: the second producer can only attach if the first one left it in place
+        producer = (
+            "import sys; sys.path.insert(0, sys.argv[1]); import straddle_scalper as ss; "
+            "ring = ss.TickRing(name=sys.argv[2]); ring.push(1.1, 1.1001, 1000.0); ring.close()"
+        )
+        agents_dir = os.path.join(os.path.dirname(__file__), '..', 'agents')
+        for _ in range(2):
+            subprocess.run([sys.executable, '-c', producer, agents_dir, ring.name], check=True)
+        assert ring.drain().tolist() == [[1.1, 1.1001, 1000.0]] * 2
+    finally:
+        ring.close()
+        ring.unlink()
+
+
+def test_modify_sl_coalesced_within_window():
+    bot = make_trail_bot(emit_coalesce_s=1.0)
+    # The open at t=2 sends its SL with the order; the trails at 2.1 and 2.2 stay pending
+    # and only the latest SL goes out once the window has passed
+    actions = run_ticks(bot, trail_ticks(1000.0, (1.1030, 2.1), (1.1040, 2.2), (1.1041, 3.5)))
+    assert [(i, action['action']) for i, action in actions] == [(2, 'OPEN_BUY'), (5, 'MODIFY_SL')]
+    assert actions[0][1]['sl'] == pytest.approx(1.1018)
+    assert actions[1][1]['sl'] == pytest.approx(1.10405)
+    assert bot.flush_pending_sl(1e9) is None
+
+
+def test_close_drops_pending_sl():
+    bot = make_trail_bot(emit_coalesce_s=1.0)
+    actions = run_ticks(bot, trail_ticks(1000.0, (1.1030, 2.1), (1.1040, 2.2), (1.1035, 2.3)))
+    assert [(i, action['action']) for i, action in actions] == [(2, 'OPEN_BUY'), (5, 'CLOSE_BUY')]
+    assert bot.active_position is None
+    assert bot.flush_pending_sl(1e9) is None
+
+    # The SL of a new position goes out with its order, not through the coalescing window
+    actions = run_ticks(bot, [(1.1050, 1.1051, 1002.4), (1.1050, 1.1051, 1005.0)])
+    assert [(i, action['action']) for i, action in actions] == [(0, 'OPEN_BUY')]
+    assert bot.flush_pending_sl(1e9) is None
+
+
+def test_zero_coalesce_emits_every_trail():
+    bot = make_trail_bot(emit_coalesce_s=0.0)
+    actions = run_ticks(bot, trail_ticks(1000.0, (1.1030, 2.0), (1.1040, 2.0)))
+    assert [(i, action['action']) for i, action in actions] == [(2, 'OPEN_BUY'), (3, 'MODIFY_SL'), (4, 'MODIFY_SL')]
+    assert [action['sl'] for _, action in actions[1:]] == pytest.approx([1.10295, 1.10395])
+
+
+def test_engine_heartbeat_flushes_on_tick_clock():
+    # Epoch timestamps are far from the host's monotonic clock: the heartbeat must extend
+    # the feed's own clock, or the pending SL would never leave
+    bot = make_trail_bot(emit_coalesce_s=0.05)
+    ring = ss.TickRing(capacity=16)
+    actions = []
+
+    def on_action(i, row, instruction):
+        actions.append((i, instruction['action'], instruction.get('sl')))
+
+    async def scenario():
+        stop = asyncio.Event()
+        engine = asyncio.create_task(ss.run_engine(bot, ring, stop, on_action=on_action))
+        for _ in range(200):
+            if len(actions) == 2:
+                break
+            await asyncio.sleep(0.01)
+        stop.set()
+        return await engine
+
+    try:
+        for row in trail_ticks(1.7e9, (1.1030, 2.01), (1.1040, 2.02)):
+            assert ring.push(*row)
+        assert asyncio.run(scenario()) == 5
+    finally:
+        ring.close()
+        ring.unlink()
+
+    assert [(i, action) for i, action, _ in actions] == [(2, 'OPEN_BUY'), (4, 'MODIFY_SL')]
+    assert actions[1][2] == pytest.approx(1.10395)
+
+
+@pytest.fixture(params=['compiled', 'python'])
+def engine_bot(request, monkeypatch):
+    """A bot for run_engine on either core: the numba kernels or the per-tick _PyCore loop."""
+    if request.param == 'compiled' and ss.njit is None:
+        pytest.skip('numba is not installed')
+    if request.param == 'python':
+        monkeypatch.setattr(ss, 'njit', None)
+    return ss.StraddleLogic(ss.StraddleConfig(velocity_threshold_pips=0.3, emit_coalesce_s=0.0))
+
+
+def test_engine_matches_scalar(engine_bot):
+    ticks = make_ticks(0, n=1000)
+    scalar_bot = ss.StraddleLogic(ss.StraddleConfig(velocity_threshold_pips=0.3, emit_coalesce_s=0.0))
+    scalar_actions = run_ticks(scalar_bot, ticks)
+
+    ring = ss.TickRing(capacity=1024)
+    actions = []
+
+    def on_action(i, row, instruction):
+        assert row.tolist() == ticks[i].tolist()
+        actions.append((i, instruction.copy()))
+
+    try:
+        for row in ticks:
+            assert ring.push(*row)
+        stop = asyncio.Event()
+        stop.set()
+        # Already stopped: the engine still drains everything queued, 7 rows at a time
+        assert asyncio.run(ss.run_engine(engine_bot, ring, stop, on_action=on_action, max_batch=7)) == 1000
+    finally:
+        ring.close()
+        ring.unlink()
+
+    assert actions == scalar_actions
+    assert snapshot(engine_bot) == snapshot(scalar_bot)
+
+
+def test_engine_processes_ticks_pushed_before_stop(engine_bot):
+    ring = ss.TickRing(capacity=64)
+
+    async def scenario():
+        stop = asyncio.Event()
+        engine = asyncio.create_task(ss.run_engine(engine_bot, ring, stop))
+        await asyncio.sleep(0.01)  # let the engine go idle on the empty ring
+        for bid, ask, timestamp in make_ticks(1, n=50):
+            ring.push(bid, ask, timestamp)
+        stop.set()
+        return await engine
+
+    try:
+        assert asyncio.run(scenario()) == 50
+        assert len(ring) == 0
+    finally:
+        ring.close()
+        ring.unlink()
+
+
+def test_engine_backs_off_when_idle():
+    class EmptyRing:
+        drains = 0
+
+        def drain(self, max_ticks=None):
+            self.drains += 1
+            return np.empty((0, 3))
+
+    ring = EmptyRing()
+
+    async def scenario():
+        stop = asyncio.Event()
+        engine = asyncio.create_task(ss.run_engine(make_bot(), ring, stop, idle_sleep=0.01))
+        await asyncio.sleep(0.2)
+        stop.set()
+        return await engine
+
+    assert asyncio.run(scenario()) == 0
+    # Capped at one poll per 10 ms after a short ramp; a busy loop would poll thousands of times
+    assert ring.drains < 60